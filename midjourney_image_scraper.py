@@ -2,20 +2,44 @@
 
 ### image download
 
+!pip install -q brotli
+
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+from urllib3.util.retry import Retry
+from lxml import etree, html as lxml_html
 import os
+import re
+import hashlib
+import json
+import shutil
 import logging
 import time
-from urllib.parse import urlsplit, urlparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
 from tqdm import tqdm
-from collections import defaultdict
+from collections import Counter
 
 # --- Configuration ---
 # Folder where you want to save the images
 DOWNLOAD_FOLDER = "midjourney_images"
 # Base URL of the website
 BASE_URL = "https://midjourneysref.com"
+# File recording hashes of URLs that were already downloaded (kept across runs)
+SEEN_URLS_FILE = "seen_urls.txt"
+# Number of newly seen URLs buffered before they are appended to SEEN_URLS_FILE
+SEEN_FLUSH_EVERY = 50
+# File recording each page's ETag/Last-Modified for conditional requests on reruns
+PAGE_VALIDATORS_FILE = "page_validators.json"
+# Sustained page requests per second, and how many may be sent in a burst
+PAGE_RATE_LIMIT = 5
+PAGE_BURST = 10
+# Number of pages scraped concurrently
+PAGE_WORKERS = 4
+# Number of concurrent image downloads per page
+IMAGE_WORKERS = 16
 
 # Set up comprehensive logging
 logging.basicConfig(
@@ -28,22 +52,224 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Statistics tracking
-stats = {
-    'pages_attempted': 0,
-    'pages_successful': 0,
-    'images_found': 0,
-    'images_downloaded': 0,
-    'images_skipped': 0,
-    'images_failed': 0,
-    'errors': defaultdict(int)
-}
+# Shared HTTP session: keep-alive connection pooling plus automatic retries
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=64,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        raise_on_status=False,  # let raise_for_status() surface the final HTTP error
+    ),
+))
+SESSION.headers.update({
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36",
+    # Only offer the encodings urllib3 can decode; br is included when the brotli
+    # package installed above was importable before urllib3 was first loaded
+    "Accept-Encoding": make_headers(accept_encoding=True)["accept-encoding"],
+})
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter that only waits once the burst is spent."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Takes one token, sleeping until it is available if necessary."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            # Reserve the token even when it is not there yet; going negative
+            # makes later callers queue up behind this one
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+# Keeps page requests polite to the site without a fixed delay between pages
+PAGE_RATE_LIMITER = TokenBucket(rate=PAGE_RATE_LIMIT, burst=PAGE_BURST)
+
+def has_class(class_name):
+    """Returns an XPath predicate matching elements that carry a CSS class."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+
+# Precompiled XPath equivalents of the CSS selectors used to find thumbnails
+THUMBNAIL_SELECTOR = 'div.m-5 img.cursor-pointer'
+THUMBNAIL_XPATH = etree.XPath(f"//div[{has_class('m-5')}]//img[{has_class('cursor-pointer')}]")
+# Fallback selectors, evaluated as a single XPath union in one tree walk
+ALTERNATIVE_SELECTORS = 'img.cursor-pointer, div.m-5 img, img[src*="midjourney"], img[src*="cdn"]'
+ALTERNATIVE_XPATH = etree.XPath(
+    f"//img[{has_class('cursor-pointer')}]"
+    f" | //div[{has_class('m-5')}]//img"
+    " | //img[contains(@src, 'midjourney')]"
+    " | //img[contains(@src, 'cdn')]"
+)
+
+# Image extensions that identify the file type without inspecting the response
+IMAGE_EXTENSION_RE = re.compile(r'\.(jpe?g|png|webp)$', re.IGNORECASE)
+# Content-type fragments accepted as an image, matched in a single scan
+IMAGE_CONTENT_TYPE_RE = re.compile(r'image/|jpe?g|png|webp')
+
+def sniff_image_extension(head):
+    """Identifies an image format from its leading magic bytes, or returns None."""
+    if head.startswith(b'\xff\xd8\xff'):
+        return '.jpg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return '.png'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return '.webp'
+    return None
+
+def describe_element(element):
+    """Renders an element's markup for log messages."""
+    return lxml_html.tostring(element, encoding='unicode', with_tail=False)
+
+# Statistics tracking: each thread counts into its own Counter, merged for the summary
+STAT_KEYS = [
+    'pages_attempted',
+    'pages_successful',
+    'pages_unchanged',
+    'images_found',
+    'images_downloaded',
+    'images_skipped',
+    'images_failed',
+]
+stats_local = threading.local()
+stats_counters = []  # every thread's Counter, registered on first use
+stats_registry_lock = threading.Lock()
+
+def local_counter():
+    """Returns the calling thread's statistics Counter, registering it on first use."""
+    try:
+        return stats_local.counter
+    except AttributeError:
+        counter = stats_local.counter = Counter()
+        with stats_registry_lock:
+            stats_counters.append(counter)
+        return counter
+
+def record_stat(key, amount=1):
+    """Increments a statistics counter without any locking."""
+    local_counter()[key] += amount
+
+def record_error(error_type):
+    """Increments the counter for an error type without any locking."""
+    local_counter()[('errors', error_type)] += 1
+
+def collect_stats():
+    """Merges the per-thread counters into a single statistics dict."""
+    total = Counter()
+    with stats_registry_lock:
+        for counter in stats_counters:
+            total.update(counter)
+    stats = {key: total[key] for key in STAT_KEYS}
+    stats['errors'] = Counter({key[1]: count for key, count in total.items() if isinstance(key, tuple)})
+    return stats
+
+# Filename -> size of files already in the download folder, loaded once at startup
+existing_files = {}
+
+def load_existing_files():
+    """Loads the download folder listing into memory so skips need no stat calls."""
+    existing_files.clear()
+    with os.scandir(DOWNLOAD_FOLDER) as entries:
+        for entry in entries:
+            if entry.is_file():
+                existing_files[entry.name] = entry.stat().st_size
+    logger.info(f"✓ Found {len(existing_files)} files already in {DOWNLOAD_FOLDER}")
+
+def is_already_downloaded(filename):
+    """Checks the in-memory folder listing for a non-empty copy of a file."""
+    file_size = existing_files.get(filename, 0)
+    if file_size > 0:
+        logger.debug("Skipping %s, already exists (%d bytes)", filename, file_size)
+        record_stat('images_skipped')
+        return True
+    if filename in existing_files:
+        logger.warning(f"Found empty file {filename}, re-downloading")
+    return False
+
+# Hashes of URLs downloaded in this or previous runs, plus those not yet persisted
+seen_urls = set()
+pending_seen_urls = []
+seen_lock = threading.RLock()
+
+def url_digest(url):
+    """Returns a stable hex digest identifying a URL."""
+    return hashlib.blake2b(url.encode(), digest_size=16).hexdigest()
+
+def load_seen_urls():
+    """Loads the hashes of previously downloaded URLs from SEEN_URLS_FILE."""
+    if os.path.exists(SEEN_URLS_FILE):
+        with open(SEEN_URLS_FILE) as f:
+            seen_urls.update(line.strip() for line in f if line.strip())
+    logger.info(f"✓ Loaded {len(seen_urls)} previously downloaded URLs")
+
+def flush_seen_urls():
+    """Appends the buffered URL hashes to SEEN_URLS_FILE in a single write."""
+    with seen_lock:
+        if not pending_seen_urls:
+            return
+        with open(SEEN_URLS_FILE, 'a') as f:
+            f.write(''.join(f"{digest}\n" for digest in pending_seen_urls))
+        pending_seen_urls.clear()
+
+def mark_url_seen(digest):
+    """Records a downloaded URL hash, flushing to disk every SEEN_FLUSH_EVERY URLs."""
+    with seen_lock:
+        if digest in seen_urls:
+            return
+        seen_urls.add(digest)
+        pending_seen_urls.append(digest)
+        if len(pending_seen_urls) >= SEEN_FLUSH_EVERY:
+            flush_seen_urls()
+
+# Page URL -> cache validators from the last time the page was fully processed
+page_validators = {}
+# Set once the stored validators are loaded; saving before that would overwrite them
+page_validators_loaded = False
+
+def load_page_validators():
+    """Loads the stored page validators from PAGE_VALIDATORS_FILE."""
+    global page_validators_loaded
+    if os.path.exists(PAGE_VALIDATORS_FILE):
+        with open(PAGE_VALIDATORS_FILE) as f:
+            page_validators.update(json.load(f))
+    page_validators_loaded = True
+    logger.info(f"✓ Loaded cache validators for {len(page_validators)} pages")
+
+def save_page_validators():
+    """Atomically writes the page validators to PAGE_VALIDATORS_FILE."""
+    if not page_validators_loaded:
+        return
+    temp_file = f"{PAGE_VALIDATORS_FILE}.tmp"
+    with open(temp_file, 'w') as f:
+        json.dump(page_validators, f)
+    os.replace(temp_file, PAGE_VALIDATORS_FILE)
+
+def conditional_headers(url):
+    """Builds If-None-Match/If-Modified-Since headers from a page's stored validators."""
+    validators = page_validators.get(url, {})
+    headers = {}
+    if validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+    if validators.get('last_modified'):
+        headers['If-Modified-Since'] = validators['last_modified']
+    return headers
 
 def validate_url(url):
     """Validates if a URL is properly formed."""
     try:
-        result = urlparse(url)
-        return all([result.scheme, result.netloc])
+        result = urlsplit(url)
+        return bool(result.scheme and result.netloc)
     except Exception:
         return False
 
@@ -51,7 +277,7 @@ def test_connectivity():
     """Tests basic connectivity to the target website."""
     logger.info("Testing connectivity to the target website...")
     try:
-        response = requests.get(BASE_URL, timeout=10)
+        response = SESSION.get(BASE_URL, timeout=10)
         if response.status_code == 200:
             logger.info(f"✓ Successfully connected to {BASE_URL}")
             return True
@@ -93,78 +319,104 @@ def create_download_folder():
         logger.error(f"✗ Failed to create or access download folder: {e}")
         raise
 
+def open_for_sequential_write(filepath):
+    """Opens a file for buffered binary writing, hinting sequential access to the kernel where supported."""
+    if not hasattr(os, 'posix_fadvise'):
+        return open(filepath, 'wb', buffering=1 << 20)
+    fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_CLOEXEC, 0o666)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+    except OSError:
+        pass  # the hint is optional, e.g. on filesystems that don't support it
+    return os.fdopen(fd, 'wb', buffering=1 << 20)
+
 def download_image(url, folder):
     """Downloads a single image from a URL into a specified folder."""
+    response = None
     try:
         # Validate URL format
         if not validate_url(url):
             logger.warning(f"Invalid URL format: {url}")
-            stats['images_failed'] += 1
-            stats['errors']['invalid_url'] += 1
+            record_stat('images_failed')
+            record_error('invalid_url')
             return False
 
-        logger.debug(f"Attempting to download: {url}")
+        # Skip URLs downloaded in a previous run without touching disk or network
+        digest = url_digest(url)
+        if digest in seen_urls:
+            logger.debug("Skipping %s, already downloaded in a previous run", url)
+            record_stat('images_skipped')
+            return True
+
+        # Create filename with better validation
+        filename = os.path.basename(urlsplit(url).path)
+        if not filename or len(filename) < 1:
+            # Generate filename from the URL digest if basename is empty;
+            # unlike hash() it is stable across runs, so reruns find the file
+            filename = f"image_{digest[:12]}"
+            logger.debug("Generated filename for URL without clear filename: %s", filename)
+
+        # Skip the request entirely when the file is already on disk
+        has_extension = bool(os.path.splitext(filename)[1])
+        if has_extension and is_already_downloaded(filename):
+            mark_url_seen(digest)
+            return True
+
+        logger.debug("Attempting to download: %s", url)
         
         # Get the image content with detailed error handling
         try:
-            response = requests.get(url, stream=True, timeout=15)
+            response = SESSION.get(url, stream=True, timeout=15)
             response.raise_for_status()
         except requests.exceptions.Timeout:
             logger.warning(f"Timeout downloading {url}")
-            stats['images_failed'] += 1
-            stats['errors']['timeout'] += 1
+            record_stat('images_failed')
+            record_error('timeout')
             return False
         except requests.exceptions.ConnectionError:
             logger.warning(f"Connection error downloading {url}")
-            stats['images_failed'] += 1
-            stats['errors']['connection_error'] += 1
+            record_stat('images_failed')
+            record_error('connection_error')
             return False
         except requests.exceptions.HTTPError as e:
             logger.warning(f"HTTP error {e.response.status_code} downloading {url}")
-            stats['images_failed'] += 1
-            stats['errors'][f'http_{e.response.status_code}'] += 1
-            return False
-
-        # Validate content type
-        content_type = response.headers.get('content-type', '').lower()
-        if not any(img_type in content_type for img_type in ['image/', 'jpeg', 'jpg', 'png', 'webp']):
-            logger.warning(f"Invalid content type '{content_type}' for {url}")
-            stats['images_failed'] += 1
-            stats['errors']['invalid_content_type'] += 1
+            # Consume the (small) error body so the keep-alive connection can be reused
+            e.response.content
+            record_stat('images_failed')
+            record_error(f'http_{e.response.status_code}')
             return False
 
-        # Create filename with better validation
-        filename = os.path.basename(urlsplit(url).path)
-        if not filename or len(filename) < 1:
-            # Generate filename from URL hash if basename is empty
-            filename = f"image_{hash(url) % 100000}"
-            logger.debug(f"Generated filename for URL without clear filename: {filename}")
-        
-        # Add extension if missing
-        if not os.path.splitext(filename)[1]:
-            # Try to determine extension from content-type
-            if 'jpeg' in content_type or 'jpg' in content_type:
-                filename += '.jpg'
-            elif 'png' in content_type:
-                filename += '.png'
-            elif 'webp' in content_type:
-                filename += '.webp'
-            else:
-                filename += '.jpg'  # default
+        response.raw.decode_content = True  # transparently undo gzip/deflate
+
+        # A known image extension in the URL makes sniffing the format unnecessary
+        head = b''
+        if not IMAGE_EXTENSION_RE.search(filename):
+            # Magic numbers identify the format even when the headers are wrong
+            head = response.raw.read(16)
+            sniffed_extension = sniff_image_extension(head)
+
+            # Fall back to the content type for formats the magic numbers don't cover
+            if not sniffed_extension:
+                content_type = response.headers.get('content-type', '').lower()
+                if not IMAGE_CONTENT_TYPE_RE.search(content_type):
+                    logger.warning(f"Invalid content type '{content_type}' for {url}")
+                    response.close()
+                    record_stat('images_failed')
+                    record_error('invalid_content_type')
+                    return False
+
+            # Add extension if missing
+            if not has_extension:
+                filename += sniffed_extension or '.jpg'  # default
+
+                # The full filename is only known now, so check for it again
+                if is_already_downloaded(filename):
+                    response.close()
+                    mark_url_seen(digest)
+                    return True
             
         filepath = os.path.join(folder, filename)
 
-        # Check if file already exists
-        if os.path.exists(filepath):
-            file_size = os.path.getsize(filepath)
-            if file_size > 0:
-                logger.debug(f"Skipping {filename}, already exists ({file_size} bytes)")
-                stats['images_skipped'] += 1
-                return True
-            else:
-                logger.warning(f"Found empty file {filename}, re-downloading")
-                os.remove(filepath)
-
         # Validate response size
         content_length = response.headers.get('content-length')
         if content_length:
@@ -174,157 +426,171 @@ def download_image(url, folder):
             elif size_mb < 0.001:  # Very small file check
                 logger.warning(f"Suspiciously small file ({int(content_length)} bytes): {url}")
 
-        # Save the image to a file
-        bytes_written = 0
-        with open(filepath, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:  # filter out keep-alive chunks
-                    f.write(chunk)
-                    bytes_written += len(chunk)
+        # Save the image to a file in large buffered writes
+        with open_for_sequential_write(filepath) as f:
+            f.write(head)
+            shutil.copyfileobj(response.raw, f, length=1 << 18)
+            bytes_written = f.tell()
 
         # Validate downloaded file
         if bytes_written == 0:
             logger.error(f"Downloaded file is empty: {filename}")
             os.remove(filepath)
-            stats['images_failed'] += 1
-            stats['errors']['empty_file'] += 1
+            record_stat('images_failed')
+            record_error('empty_file')
             return False
         
         final_size = os.path.getsize(filepath)
-        logger.debug(f"✓ Successfully downloaded {filename} ({final_size} bytes)")
-        stats['images_downloaded'] += 1
+        existing_files[filename] = final_size
+        mark_url_seen(digest)
+        logger.debug("✓ Successfully downloaded %s (%d bytes)", filename, final_size)
+        record_stat('images_downloaded')
         return True
 
     except Exception as e:
         logger.error(f"Unexpected error downloading {url}: {e}")
-        stats['images_failed'] += 1
-        stats['errors']['unexpected_download_error'] += 1
+        if response is not None:
+            response.close()  # the body may be half-read, so drop the connection
+        record_stat('images_failed')
+        record_error('unexpected_download_error')
         return False
 
 def scrape_page(page_number):
     """Scrapes a single page to find and download all images."""
-    stats['pages_attempted'] += 1
+    record_stat('pages_attempted')
     target_url = f"{BASE_URL}/discover?page={page_number}"
     logger.info(f"\n--- Scraping Page {page_number}: {target_url} ---")
 
     try:
-        # Get the HTML content with retries
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                logger.debug(f"Fetching page content (attempt {attempt + 1}/{max_retries})")
-                response = requests.get(target_url, timeout=10)
-                response.raise_for_status()
-                break
-            except requests.exceptions.RequestException as e:
-                logger.warning(f"Attempt {attempt + 1} failed: {e}")
-                if attempt == max_retries - 1:
-                    raise
-                time.sleep(2)  # Wait before retry
+        # Get the HTML content (retries are handled by the session adapter)
+        logger.debug("Fetching page content")
+        PAGE_RATE_LIMITER.acquire()
+        response = SESSION.get(target_url, headers=conditional_headers(target_url), timeout=10)
+        response.raise_for_status()
+
+        # Nothing to do if the page is unchanged since it was last fully processed
+        if response.status_code == 304:
+            logger.info(f"Page {page_number} not modified since the last run, skipping")
+            record_stat('pages_unchanged')
+            return
 
         # Validate response
-        if len(response.text) < 1000:
-            logger.warning(f"Page content seems unusually short ({len(response.text)} characters)")
+        # Work on the raw bytes; lxml detects the encoding itself
+        content_length = len(response.content)
+        if content_length < 1000:
+            logger.warning(f"Page content seems unusually short ({content_length} bytes)")
         
-        logger.debug(f"Received {len(response.text)} characters of HTML content")
+        logger.debug("Received %d bytes of HTML content", content_length)
         
-        soup = BeautifulSoup(response.text, 'html.parser')
+        # Always parse as a full document; fromstring() would treat pages that
+        # don't start with <html>/<!doctype> as fragments
+        tree = lxml_html.document_fromstring(response.content)
 
         # Validate HTML structure
-        if not soup.find('html'):
-            logger.error("Invalid HTML structure received - no <html> tag found")
-            stats['errors']['invalid_html'] += 1
+        if tree.find('body') is None:
+            logger.error("Invalid HTML structure received - no <body> tag found")
+            record_error('invalid_html')
             return
 
         # Find thumbnail images with detailed feedback
-        logger.debug("Searching for image thumbnails using selector: 'div.m-5 img.cursor-pointer'")
-        thumbnail_tags = soup.select('div.m-5 img.cursor-pointer')
+        logger.debug("Searching for image thumbnails using selector: '%s'", THUMBNAIL_SELECTOR)
+        thumbnail_tags = THUMBNAIL_XPATH(tree)
         
         if not thumbnail_tags:
             logger.warning("No images found with primary selector. Trying alternative selectors...")
             
             # Try alternative selectors
-            alternative_selectors = [
-                'img.cursor-pointer',
-                'div.m-5 img',
-                'img[src*="midjourney"]',
-                'img[src*="cdn"]'
-            ]
-            
-            for selector in alternative_selectors:
-                logger.debug(f"Trying selector: {selector}")
-                thumbnail_tags = soup.select(selector)
-                if thumbnail_tags:
-                    logger.info(f"Found {len(thumbnail_tags)} images with alternative selector: {selector}")
-                    break
+            logger.debug("Trying selectors: %s", ALTERNATIVE_SELECTORS)
+            thumbnail_tags = ALTERNATIVE_XPATH(tree)
+            if thumbnail_tags:
+                logger.info(f"Found {len(thumbnail_tags)} images with alternative selectors: {ALTERNATIVE_SELECTORS}")
             
             if not thumbnail_tags:
                 logger.error("No images found with any selector. The site structure may have changed.")
-                logger.debug("Available img tags on page:")
-                all_imgs = soup.find_all('img')
-                for i, img in enumerate(all_imgs[:5]):  # Show first 5 img tags
-                    logger.debug(f"  {i+1}. {img}")
-                if len(all_imgs) > 5:
-                    logger.debug(f"  ... and {len(all_imgs) - 5} more img tags")
-                stats['errors']['no_images_found'] += 1
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Available img tags on page:")
+                    all_imgs = tree.xpath('//img')
+                    for i, img in enumerate(all_imgs[:5]):  # Show first 5 img tags
+                        logger.debug("  %d. %s", i + 1, describe_element(img))
+                    if len(all_imgs) > 5:
+                        logger.debug("  ... and %d more img tags", len(all_imgs) - 5)
+                record_error('no_images_found')
                 return
 
         logger.info(f"✓ Found {len(thumbnail_tags)} images to download on page {page_number}")
-        stats['images_found'] += len(thumbnail_tags)
+        record_stat('images_found', len(thumbnail_tags))
         
-        # Download images with progress tracking
-        successful_downloads = 0
+        # Resolve the full-resolution URL of every thumbnail
+        full_res_urls = []
         failed_downloads = 0
-        
-        for i, img_tag in enumerate(tqdm(thumbnail_tags, desc=f"Page {page_number}")):
-            logger.debug(f"Processing image {i+1}/{len(thumbnail_tags)}")
+
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+        total_tags = len(thumbnail_tags)
+
+        for i, img_tag in enumerate(thumbnail_tags):
+            if debug_enabled:
+                logger.debug("Processing image %d/%d", i + 1, total_tags)
             
             thumbnail_src = img_tag.get('src')
             if not thumbnail_src:
-                logger.warning(f"Image tag {i+1} has no 'src' attribute: {img_tag}")
+                logger.warning(f"Image tag {i+1} has no 'src' attribute: {describe_element(img_tag)}")
                 failed_downloads += 1
                 continue
 
-            logger.debug(f"Thumbnail src: {thumbnail_src}")
+            if debug_enabled:
+                logger.debug("Thumbnail src: %s", thumbnail_src)
 
             # Extract the full-resolution URL
-            try:
-                if 'fit=cover/' in thumbnail_src:
-                    full_res_url = thumbnail_src.split('fit=cover/')[1]
-                    logger.debug(f"Extracted full-res URL: {full_res_url}")
-                else:
-                    # Try using the thumbnail URL directly
-                    full_res_url = thumbnail_src
-                    logger.debug(f"Using thumbnail URL directly: {full_res_url}")
-                
-                # Download the image
-                if download_image(full_res_url, DOWNLOAD_FOLDER):
-                    successful_downloads += 1
-                else:
-                    failed_downloads += 1
-                    
-            except Exception as e:
-                logger.error(f"Error processing image {i+1}: {e}")
-                failed_downloads += 1
-                stats['errors']['processing_error'] += 1
+            _, sep, full_res_url = thumbnail_src.partition('fit=cover/')
+            if sep:
+                if debug_enabled:
+                    logger.debug("Extracted full-res URL: %s", full_res_url)
+            else:
+                # Try using the thumbnail URL directly
+                full_res_url = thumbnail_src
+                if debug_enabled:
+                    logger.debug("Using thumbnail URL directly: %s", full_res_url)
+            full_res_urls.append(full_res_url)
+
+        # Download images concurrently with progress tracking
+        with ThreadPoolExecutor(max_workers=IMAGE_WORKERS) as executor:
+            results = list(tqdm(
+                executor.map(lambda url: download_image(url, DOWNLOAD_FOLDER), full_res_urls),
+                total=len(full_res_urls),
+                desc=f"Page {page_number}",
+            ))
+        successful_downloads = sum(results)
+        failed_downloads += len(results) - successful_downloads
 
         logger.info(f"Page {page_number} complete: {successful_downloads} successful, {failed_downloads} failed")
-        stats['pages_successful'] += 1
+        record_stat('pages_successful')
+
+        # Only remember the page once all of its images are on disk, so that
+        # pages with failed downloads are fetched again on the next run
+        if failed_downloads == 0:
+            validators = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+            }
+            if any(validators.values()):
+                page_validators[target_url] = validators
 
     except requests.exceptions.RequestException as e:
         logger.error(f"✗ Failed to fetch page {page_number}. Error: {e}")
-        stats['errors']['page_fetch_error'] += 1
+        record_error('page_fetch_error')
     except Exception as e:
         logger.error(f"✗ Unexpected error processing page {page_number}: {e}")
-        stats['errors']['unexpected_page_error'] += 1
+        record_error('unexpected_page_error')
 
 def print_summary():
     """Prints a detailed summary of the scraping session."""
+    stats = collect_stats()
     logger.info("\n" + "="*60)
     logger.info("SCRAPING SESSION SUMMARY")
     logger.info("="*60)
     logger.info(f"Pages attempted: {stats['pages_attempted']}")
     logger.info(f"Pages successful: {stats['pages_successful']}")
+    logger.info(f"Pages unchanged since last run: {stats['pages_unchanged']}")
     logger.info(f"Images found: {stats['images_found']}")
     logger.info(f"Images downloaded: {stats['images_downloaded']}")
     logger.info(f"Images skipped (already exist): {stats['images_skipped']}")
@@ -364,6 +630,9 @@ try:
         
     # Create the folder to store images
     create_download_folder()
+    load_existing_files()
+    load_seen_urls()
+    load_page_validators()
 
     # Configuration validation
     start_page = 0
@@ -377,13 +646,12 @@ try:
     total_pages = end_page - start_page + 1
     logger.info(f"Will attempt to scrape {total_pages} pages")
 
-    # Scrape pages
-    for page in range(start_page, end_page + 1):
-        scrape_page(page)
-            
-        # Add small delay between pages to be respectful
-        if page < end_page:
-            time.sleep(1)
+    # Scrape pages concurrently; pages are independent of each other
+    page_executor = ThreadPoolExecutor(max_workers=PAGE_WORKERS)
+    try:
+        list(page_executor.map(scrape_page, range(start_page, end_page + 1)))
+    finally:
+        page_executor.shutdown(cancel_futures=True)
 
     # Print comprehensive summary
     print_summary()
@@ -395,48 +663,41 @@ except Exception as e:
     logger.error(f"Fatal error: {e}")
     print_summary()
     raise
+finally:
+    flush_seen_urls()
+    save_page_validators()
 
 
 #### dataset construction
 
-def get_almost_sref(x):
-    x = x.split("--sref")[-1]
-    return Path(x).stem.split('-')[0] if '-' in Path(x).stem else Path(x).stem
-
-def get_first_all_numbers(x):
-    #print("x :", x)
-    l = x.strip().split("_")
-    req = x
-    #print("l :", l)
-    for ele in l:
-        if ele.strip() and all(map(lambda y: y in "0123456789", ele)):
-            #print("ele :" ,ele)
-            return ele
-    return req
-
-import pathlib 
+# push_to_hub(num_proc=...) below was added in datasets 4.0
+!pip install -q "datasets>=4.0"
+
 import pandas as pd 
 import os
-from pathlib import Path
 from datasets import Dataset, Image as HfImage
-df = pd.DataFrame( 
-pd.Series(
-    pathlib.Path("midjourney_images").rglob("*")
-).map(str)
+# The download folder is flat, so a single scandir pass lists every image
+with os.scandir("midjourney_images") as entries:
+    df = pd.DataFrame({"image": [entry.path for entry in entries if entry.is_file()]})
+df["filename"] = df["image"].str.rsplit("/", n=1).str[-1]
+# Stem of the path after "--sref", cut at its first '-'
+almost_sref = (
+    df["image"].str.split("--sref").str[-1]
+    .str.rsplit("/", n=1).str[-1]
+    .str.replace(r"(?<=.)\.[^.]+$", "", regex=True)
+    .str.split("-").str[0]
 )
-df.columns = ["image"]
-df["filename"] = df["image"].map(lambda x: x.split("/")[-1])
-df["sref"] = df["image"].map(get_almost_sref)
-df["sref"] = df["sref"].map(get_first_all_numbers) 
-df = df[
-    df["sref"].map(
-        lambda x: bool(x.strip()) and all(map(lambda y: y in "0123456789", x.strip()))
-    )
-].reset_index().iloc[:, 1:]
+# The sref is the first purely numeric '_'-separated token; rows without one are dropped
+df["sref"] = almost_sref.str.strip().str.extract(r"(?:^|_)([0-9]+)(?=_|$)", expand=False)
+df = df[df["sref"].notna()].reset_index().iloc[:, 1:]
 
 ds = Dataset.from_pandas(df.sort_values("sref").reset_index().iloc[:, 1:]).cast_column("image", HfImage())
 ds
 
 !huggingface-cli login 
 
-ds.push_to_hub("svjack/midjourney_images_{}".format(len(df)))
+# Embed and upload shards in parallel, one worker per core
+ds.push_to_hub(
+    "svjack/midjourney_images_{}".format(len(df)),
+    num_proc=os.cpu_count(),
+)